@@ -1,16 +1,34 @@
+import atexit
+import io
 import json
 import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from functools import partial
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
-from flask import Flask, flash, redirect, render_template, request, url_for
+from flask import (
+    Flask,
+    flash,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    url_for,
+)
+from markupsafe import Markup, escape
 
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "time-tracker-secret")
 
 DATA_DIR = os.path.join(app.root_path, "data")
-DATA_FILE = os.path.join(DATA_DIR, "time_tracker.xlsx")
+DATA_FILE = os.path.join(DATA_DIR, "time_tracker.db")
+LEGACY_WORKBOOK = os.path.join(DATA_DIR, "time_tracker.xlsx")
 
 LOG_COLUMNS = [
     "Date",
@@ -24,105 +42,473 @@ LOG_COLUMNS = [
 PROJECT_COLUMNS = ["Project", "Activity"]
 ACTIVE_COLUMNS = ["Project", "Activity", "Notes", "Start"]
 
+# Every stored date/timestamp uses exactly one of these layouts, so values can
+# be parsed back with an explicit format instead of per-column inference.
+DATE_FORMAT = "%Y-%m-%d"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+DATE_COLUMNS = ("Date",)
+TIMESTAMP_COLUMNS = ("Start", "End")
+
+# Frames returned by read_workbook, reused until the database files change,
+# plus values derived from exactly those frames (project catalog, summary).
+# Each worker process keeps its own copy; the lock covers threaded servers.
+_WB_CACHE: Dict[str, Any] = {"version": None, "data": None, "derived": {}}
+_WB_CACHE_LOCK = threading.Lock()
+
+# Writes submitted by request handlers, committed in order by a single
+# background thread so responses do not wait on disk I/O.
+_WRITE_QUEUE: "queue.Queue[Callable[[sqlite3.Connection], None]]" = queue.Queue()
+_WRITER_LOCK = threading.Lock()
+_WRITER: Optional[threading.Thread] = None
+# Messages for queued writes that failed after their request had returned.
+_WRITE_FAILURES: List[str] = []
+
+SCHEMA_VERSION = 1
+_SCHEMA_READY = False
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log (
+    "Date" TEXT,
+    "Project" TEXT,
+    "Activity" TEXT,
+    "Start" TEXT,
+    "End" TEXT,
+    "DurationMinutes" REAL,
+    "Notes" TEXT
+);
+CREATE INDEX IF NOT EXISTS log_start ON log ("Start");
+CREATE INDEX IF NOT EXISTS log_project_activity ON log ("Project", "Activity");
+CREATE TABLE IF NOT EXISTS projects (
+    "Project" TEXT,
+    "Activity" TEXT
+);
+CREATE TABLE IF NOT EXISTS active (
+    "Project" TEXT,
+    "Activity" TEXT,
+    "Notes" TEXT,
+    "Start" TEXT
+);
+"""
+
+
+def _column_list(columns: List[str]) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def _to_sql_value(column: str, value: object) -> object:
+    """Convert a pandas/datetime cell into a value sqlite3 can bind.
+
+    Dates and timestamps are written in ``DATE_FORMAT``/``TIMESTAMP_FORMAT``
+    whatever their source type, so each column holds a single layout.
+    """
+    if value is None or pd.isna(value):
+        return None
+    if column in DATE_COLUMNS:
+        return pd.Timestamp(value).strftime(DATE_FORMAT)
+    if column in TIMESTAMP_COLUMNS:
+        return pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+def _insert_rows(
+    conn: sqlite3.Connection, table: str, columns: List[str], df: pd.DataFrame
+) -> None:
+    if df.empty:
+        return
+    placeholders = ", ".join("?" for _ in columns)
+    rows = [
+        tuple(_to_sql_value(column, value) for column, value in zip(columns, row))
+        for row in df.reindex(columns=columns).itertuples(index=False, name=None)
+    ]
+    conn.executemany(
+        f"INSERT INTO {table} ({_column_list(columns)}) VALUES ({placeholders})",
+        rows,
+    )
+
+
+def _coerce_legacy_dates(sheet_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Parse date/time cells of a hand-edited sheet, blanking unreadable ones.
+
+    Cells are parsed one by one so a single odd value neither blocks the
+    import nor changes how the rest of the column is interpreted.
+    """
+    for column in DATE_COLUMNS + TIMESTAMP_COLUMNS:
+        if column not in df.columns:
+            continue
+        parsed = df[column].map(lambda value: pd.to_datetime(value, errors="coerce"))
+        unreadable = parsed.isna() & df[column].notna()
+        if unreadable.any():
+            # Sheet row numbers: +1 for the header row, +1 for 1-based rows.
+            rows = ", ".join(str(row + 2) for row in df.index[unreadable])
+            app.logger.warning(
+                "Legacy %s sheet: unreadable %s in rows %s imported as empty",
+                sheet_name,
+                column,
+                rows,
+            )
+        df[column] = parsed
+    return df
+
+
+def _import_legacy_workbook(conn: sqlite3.Connection) -> None:
+    """Copy the sheets of a pre-SQLite Excel workbook into the new tables."""
+    with pd.ExcelFile(LEGACY_WORKBOOK) as xls:
+        sheets = {
+            name: _coerce_legacy_dates(name, pd.read_excel(xls, name))
+            for name in xls.sheet_names
+        }
+    _insert_rows(conn, "log", LOG_COLUMNS, sheets.get("Log", pd.DataFrame()))
+    _insert_rows(
+        conn, "projects", PROJECT_COLUMNS, sheets.get("Projects", pd.DataFrame())
+    )
+    _insert_rows(conn, "active", ACTIVE_COLUMNS, sheets.get("Active", pd.DataFrame()))
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(DATA_FILE, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
 
 def ensure_workbook() -> None:
-    """Create the Excel workbook with the expected sheets when missing."""
+    """Create the SQLite tables when missing.
+
+    An existing Excel workbook from earlier versions is imported on creation.
+    The check runs inside an immediate transaction and is recorded in
+    ``PRAGMA user_version``, so concurrent first requests set up (and import)
+    exactly once. A failed setup rolls back and is retried on the next call.
+    """
+    global _SCHEMA_READY
+    if _SCHEMA_READY:
+        return
     os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(DATA_FILE):
-        log_df = pd.DataFrame(columns=LOG_COLUMNS)
-        projects_df = pd.DataFrame(columns=PROJECT_COLUMNS)
-        active_df = pd.DataFrame(columns=ACTIVE_COLUMNS)
-        with pd.ExcelWriter(DATA_FILE, engine="openpyxl") as writer:
-            log_df.to_excel(writer, sheet_name="Log", index=False)
-            projects_df.to_excel(writer, sheet_name="Projects", index=False)
-            active_df.to_excel(writer, sheet_name="Active", index=False)
+    with _connect() as conn, _transaction(conn):
+        (user_version,) = conn.execute("PRAGMA user_version").fetchone()
+        if user_version < SCHEMA_VERSION:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            if os.path.exists(LEGACY_WORKBOOK):
+                _import_legacy_workbook(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    _SCHEMA_READY = True
+
+
+def _database_version() -> Tuple[int, ...]:
+    """Return a stamp that changes whenever the database or its WAL is written."""
+    version: List[int] = []
+    for suffix in ("", "-wal"):
+        try:
+            stat = os.stat(DATA_FILE + suffix)
+        except FileNotFoundError:
+            version.extend((0, 0))
+        else:
+            version.extend((stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def invalidate_workbook_cache() -> None:
+    with _WB_CACHE_LOCK:
+        _WB_CACHE["version"] = None
+        _WB_CACHE["data"] = None
+        _WB_CACHE["derived"] = {}
+
+
+def _as_datetime(values: pd.Series) -> pd.Series:
+    """Parse ``values`` as timestamps unless they already have a datetime dtype."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors="coerce")
+
+
+def _parse_stored(values: pd.Series, fmt: str, label: str) -> pd.Series:
+    """Parse stored text with ``fmt``, logging how many values became NaT."""
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    invalid = int((parsed.isna() & values.notna()).sum())
+    if invalid:
+        app.logger.warning(
+            "%d %s value(s) do not match %r and were read as NaT", invalid, label, fmt
+        )
+    return parsed
+
+
+def _query_log(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Load the log with Date/Start/End parsed and DurationMinutes as float.
+
+    Values are parsed with the exact formats ``_to_sql_value`` writes; a
+    malformed value becomes NaT and is reported by ``_parse_stored``.
+    """
+    log_df = pd.read_sql_query(
+        f"SELECT {_column_list(LOG_COLUMNS)} FROM log",
+        conn,
+        dtype={"DurationMinutes": "float64"},
+    )
+    for column in DATE_COLUMNS:
+        log_df[column] = _parse_stored(log_df[column], DATE_FORMAT, f"log.{column}")
+    for column in TIMESTAMP_COLUMNS:
+        log_df[column] = _parse_stored(
+            log_df[column], TIMESTAMP_FORMAT, f"log.{column}"
+        )
+    return log_df
+
+
+def _query_projects(conn: sqlite3.Connection) -> pd.DataFrame:
+    return pd.read_sql_query(
+        f"SELECT {_column_list(PROJECT_COLUMNS)} FROM projects", conn
+    )
+
+
+def _query_active(conn: sqlite3.Connection) -> pd.DataFrame:
+    active_df = pd.read_sql_query(
+        f"SELECT {_column_list(ACTIVE_COLUMNS)} FROM active LIMIT 1", conn
+    )
+    active_df["Start"] = _parse_stored(
+        active_df["Start"], TIMESTAMP_FORMAT, "active.Start"
+    )
+    return active_df
+
+
+def _read_workbook_versioned() -> Tuple[
+    Tuple[int, ...], Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+]:
+    """Return the cached frames together with the stamp they were read at.
+
+    The stamp is taken before the reads, which share one WAL snapshot, so the
+    frames are never older than the stamp they are cached under.
+    """
+    ensure_workbook()
+    flush_writes()
+    with _WB_CACHE_LOCK:
+        version = _database_version()
+        if _WB_CACHE["version"] == version:
+            return version, _WB_CACHE["data"]
+        with _connect() as conn:
+            conn.execute("BEGIN")
+            log_df = _query_log(conn)
+            projects_df = _query_projects(conn)
+            active_df = _query_active(conn)
+            conn.execute("COMMIT")
+        _WB_CACHE["version"] = version
+        _WB_CACHE["data"] = (log_df, projects_df, active_df)
+        _WB_CACHE["derived"] = {}
+    return version, (log_df, projects_df, active_df)
 
 
 def read_workbook() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Read the workbook sheets containing log, projects, and active entry."""
+    """Read the tables containing log, projects, and active entry.
+
+    The frames are cached until the database changes on disk and are shared
+    between callers, so they must not be modified in place.
+    """
+    return _read_workbook_versioned()[1]
+
+
+def _read_table(query: Callable[[sqlite3.Connection], pd.DataFrame]) -> pd.DataFrame:
     ensure_workbook()
-    with pd.ExcelFile(DATA_FILE) as xls:
-        log_df = pd.read_excel(xls, "Log")
-        projects_df = pd.read_excel(xls, "Projects")
-        try:
-            active_df = pd.read_excel(xls, "Active")
-        except ValueError:
-            active_df = pd.DataFrame(columns=ACTIVE_COLUMNS)
-    return log_df, projects_df, active_df
+    flush_writes()
+    with _connect() as conn:
+        return query(conn)
+
+
+def read_projects() -> pd.DataFrame:
+    """Read only the defined projects and activities."""
+    return _read_table(_query_projects)
+
+
+def read_active() -> pd.DataFrame:
+    """Read only the running timer."""
+    return _read_table(_query_active)
+
+
+@contextmanager
+def write_transaction() -> Iterator[sqlite3.Connection]:
+    """Yield a connection whose writes are committed together on exit."""
+    ensure_workbook()
+    try:
+        with _connect() as conn, _transaction(conn):
+            yield conn
+    finally:
+        invalidate_workbook_cache()
 
 
-def write_workbook(
-    log_df: pd.DataFrame,
-    projects_df: pd.DataFrame,
-    active_df: Optional[pd.DataFrame] = None,
+def _insert_row(
+    conn: sqlite3.Connection, table: str, columns: List[str], row: Dict[str, object]
 ) -> None:
-    """Persist the workbook sheets with the supplied dataframes."""
-    os.makedirs(DATA_DIR, exist_ok=True)
-    log_to_write = log_df.copy()
-    if not log_to_write.empty:
-        for column in ("Date", "Start", "End"):
-            if column in log_to_write.columns:
-                log_to_write[column] = pd.to_datetime(
-                    log_to_write[column], errors="coerce"
-                )
-        if "Date" in log_to_write.columns:
-            log_to_write["Date"] = log_to_write["Date"].dt.date
-    projects_to_write = projects_df.copy()
-    active_to_write = (
-        active_df.copy()
-        if active_df is not None
-        else pd.DataFrame(columns=ACTIVE_COLUMNS)
+    placeholders = ", ".join("?" for _ in columns)
+    conn.execute(
+        f"INSERT INTO {table} ({_column_list(columns)}) VALUES ({placeholders})",
+        tuple(_to_sql_value(column, row.get(column)) for column in columns),
     )
-    if not active_to_write.empty and "Start" in active_to_write.columns:
-        active_to_write["Start"] = pd.to_datetime(
-            active_to_write["Start"], errors="coerce"
-        )
-    with pd.ExcelWriter(DATA_FILE, engine="openpyxl") as writer:
-        log_to_write.to_excel(writer, sheet_name="Log", index=False)
-        projects_to_write.to_excel(writer, sheet_name="Projects", index=False)
-        active_to_write.to_excel(writer, sheet_name="Active", index=False)
+
+
+def append_log_row(conn: sqlite3.Connection, entry: Dict[str, object]) -> None:
+    """Append a single finished session to the log."""
+    _insert_row(conn, "log", LOG_COLUMNS, entry)
+
+
+def write_active(
+    conn: sqlite3.Connection, entry: Optional[Dict[str, object]]
+) -> None:
+    """Replace the running timer with ``entry``, or clear it when ``None``."""
+    conn.execute("DELETE FROM active")
+    if entry is not None:
+        _insert_row(conn, "active", ACTIVE_COLUMNS, entry)
+
+
+def stop_active(conn: sqlite3.Connection, start: datetime) -> bool:
+    """Clear the timer started at ``start``; return whether it was still running.
+
+    Overlapping stop requests for the same timer race on this delete, so only
+    one of them sees a deleted row and logs the session.
+    """
+    cursor = conn.execute(
+        'DELETE FROM active WHERE "Start" = ?', (_to_sql_value("Start", start),)
+    )
+    return cursor.rowcount == 1
+
+
+def append_project_row(conn: sqlite3.Connection, project: str, activity: str) -> None:
+    """Register a new activity under ``project``."""
+    _insert_row(
+        conn, "projects", PROJECT_COLUMNS, {"Project": project, "Activity": activity}
+    )
+
+
+def _run_writer() -> None:
+    while True:
+        write = _WRITE_QUEUE.get()
+        try:
+            with write_transaction() as conn:
+                write(conn)
+        except Exception as error:
+            app.logger.exception("Failed to write to the time tracker database")
+            with _WRITER_LOCK:
+                _WRITE_FAILURES.append(
+                    f"A recent change could not be saved and was discarded: {error}"
+                )
+        finally:
+            _WRITE_QUEUE.task_done()
+
+
+def submit_write(write: Callable[[sqlite3.Connection], None]) -> None:
+    """Queue ``write`` to run in its own transaction on the writer thread."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None or not _WRITER.is_alive():
+            _WRITER = threading.Thread(
+                target=_run_writer, name="time-tracker-writer", daemon=True
+            )
+            _WRITER.start()
+    _WRITE_QUEUE.put(write)
+
+
+def flush_writes() -> None:
+    """Block until every queued write has been committed."""
+    _WRITE_QUEUE.join()
+
+
+def pop_write_failures() -> List[str]:
+    """Return and forget the messages of queued writes that failed."""
+    flush_writes()
+    with _WRITER_LOCK:
+        failures = list(_WRITE_FAILURES)
+        _WRITE_FAILURES.clear()
+    return failures
+
+
+atexit.register(flush_writes)
+
+
+def export_workbook() -> io.BytesIO:
+    """Render the log, projects, and active entry as an Excel workbook."""
+    log_df, projects_df, active_df = read_workbook()
+    log_df = log_df.assign(Date=log_df["Date"].dt.date)
+    buffer = io.BytesIO()
+    # constant_memory is deliberately not used: it requires row-by-row writes,
+    # while DataFrame.to_excel emits cells column by column.
+    with pd.ExcelWriter(
+        buffer,
+        engine="xlsxwriter",
+        datetime_format="yyyy-mm-dd hh:mm:ss",
+        date_format="yyyy-mm-dd",
+        engine_kwargs={"options": {"strings_to_urls": False}},
+    ) as writer:
+        log_df.to_excel(writer, sheet_name="Log", index=False)
+        projects_df.to_excel(writer, sheet_name="Projects", index=False)
+        active_df.to_excel(writer, sheet_name="Active", index=False)
+    buffer.seek(0)
+    return buffer
+
+
+def _clean_names(names: pd.Series) -> pd.Series:
+    return names.fillna("").astype(str).str.strip()
+
+
+def _name_category(names: pd.Series) -> pd.Series:
+    return _clean_names(names).astype("category")
 
 
 def normalize_log_dataframe(log_df: pd.DataFrame) -> pd.DataFrame:
+    """Return the log with typed date, timestamp, and duration columns.
+
+    Project and Activity become stripped categoricals with "" for missing
+    names. The input frame is left untouched.
+    """
     if log_df.empty:
         return pd.DataFrame(columns=LOG_COLUMNS)
-    normalized = log_df.copy()
-    if "Date" in normalized.columns:
-        normalized["Date"] = pd.to_datetime(normalized["Date"], errors="coerce").dt.date
-    for column in ("Start", "End"):
-        if column in normalized.columns:
-            normalized[column] = pd.to_datetime(normalized[column], errors="coerce")
-    if "DurationMinutes" in normalized.columns:
-        normalized["DurationMinutes"] = pd.to_numeric(
-            normalized["DurationMinutes"], errors="coerce"
-        ).fillna(0)
-    else:
-        normalized["DurationMinutes"] = 0
-    return normalized
+    return log_df.assign(
+        Date=_as_datetime(log_df["Date"]).dt.date,
+        Start=_as_datetime(log_df["Start"]),
+        End=_as_datetime(log_df["End"]),
+        DurationMinutes=pd.to_numeric(
+            log_df["DurationMinutes"], errors="coerce"
+        ).fillna(0),
+        Project=_name_category(log_df["Project"]),
+        Activity=_name_category(log_df["Activity"]),
+    )
 
 
-def build_project_map(projects_df: pd.DataFrame) -> Dict[str, List[str]]:
-    if projects_df.empty:
-        return {}
-    cleaned = projects_df.fillna("")
-    cleaned["Project"] = cleaned["Project"].astype(str).str.strip()
-    cleaned["Activity"] = cleaned["Activity"].astype(str).str.strip()
-    grouped: Dict[str, List[str]] = {}
-    for project, group in cleaned.groupby("Project"):
-        activities = sorted(
-            {activity for activity in group["Activity"].tolist() if activity}
-        )
-        if project:
-            grouped[project] = activities
-    return grouped
+# Project -> sorted activities, plus the lower-cased (project, activity) pairs
+# used for duplicate checks, both derived from one read of the projects table.
+ProjectCatalog = Tuple[Dict[str, List[str]], FrozenSet[Tuple[str, str]]]
 
 
-def _safe_string(value: object) -> str:
-    if isinstance(value, str):
-        return value
-    if pd.isna(value):
-        return ""
-    return str(value)
+def build_project_catalog(projects_df: pd.DataFrame) -> ProjectCatalog:
+    if projects_df.empty:
+        return {}, frozenset()
+    projects = _clean_names(projects_df["Project"])
+    activities = _clean_names(projects_df["Activity"]).tolist()
+    codes, names = pd.factorize(projects.to_numpy(), sort=True)
+    grouped: List[Set[str]] = [set() for _ in names]
+    for code, activity in zip(codes.tolist(), activities):
+        if activity:
+            grouped[code].add(activity)
+    project_map = {
+        project: sorted(project_activities)
+        for project, project_activities in zip(names, grouped)
+        if project
+    }
+    pairs = frozenset(
+        (project.lower(), activity.lower())
+        for project, activity in zip(projects.tolist(), activities)
+        if project and activity
+    )
+    return project_map, pairs
 
 
 def add_project_activity(project: str, activity: str) -> Tuple[bool, str]:
@@ -130,20 +516,12 @@ def add_project_activity(project: str, activity: str) -> Tuple[bool, str]:
     activity_name = activity.strip()
     if not project_name or not activity_name:
         return False, "Project and activity names are both required."
-    log_df, projects_df, active_df = read_workbook()
-    if not projects_df.empty:
-        existing = projects_df[
-            projects_df["Project"].astype(str).str.lower() == project_name.lower()
-        ]
-        if not existing.empty:
-            match = existing[
-                existing["Activity"].astype(str).str.lower() == activity_name.lower()
-            ]
-            if not match.empty:
-                return False, "This activity is already defined for the project."
-    new_row = pd.DataFrame([{ "Project": project_name, "Activity": activity_name }])
-    updated_projects = pd.concat([projects_df, new_row], ignore_index=True)
-    write_workbook(log_df, updated_projects, active_df)
+    _, pairs = read_project_catalog()
+    if (project_name.lower(), activity_name.lower()) in pairs:
+        return False, "This activity is already defined for the project."
+    submit_write(
+        partial(append_project_row, project=project_name, activity=activity_name)
+    )
     return True, f"Added '{activity_name}' to {project_name}."
 
 
@@ -158,16 +536,83 @@ def format_duration(minutes: float) -> str:
     return f"{secs}s"
 
 
+def format_durations(minutes: np.ndarray) -> List[str]:
+    """Format an array of minute totals the same way as ``format_duration``."""
+    total_seconds = np.rint(np.asarray(minutes, dtype=np.float64) * 60).astype(np.int64)
+    hours, remainder = np.divmod(total_seconds, 3600)
+    mins, secs = np.divmod(remainder, 60)
+    labels: List[str] = []
+    for h, m, s in zip(hours.tolist(), mins.tolist(), secs.tolist()):
+        if h:
+            labels.append(f"{h:02d}h {m:02d}m")
+        elif m:
+            labels.append(f"{m}m {s:02d}s")
+        else:
+            labels.append(f"{s}s")
+    return labels
+
+
+_MONTH_ABBREVIATIONS = (
+    "",
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+)
+
+
+def _format_date(value: date) -> str:
+    """Equivalent to ``strftime("%b %d, %Y")`` without the locale machinery."""
+    return f"{_MONTH_ABBREVIATIONS[value.month]} {value.day:02d}, {value.year}"
+
+
+def _format_datetime(value: datetime) -> str:
+    """Equivalent to ``strftime("%b %d, %Y %I:%M %p")``."""
+    hour = value.hour % 12 or 12
+    meridiem = "AM" if value.hour < 12 else "PM"
+    return f"{_format_date(value)} {hour:02d}:{value.minute:02d} {meridiem}"
+
+
 def format_week_label(week_start: datetime) -> str:
     if isinstance(week_start, datetime):
         start_dt = week_start
     else:
         start_dt = datetime.combine(week_start, datetime.min.time())
     week_end = start_dt + timedelta(days=6)
-    return f"{start_dt.strftime('%b %d, %Y')} – {week_end.strftime('%b %d, %Y')}"
+    return f"{_format_date(start_dt)} – {_format_date(week_end)}"
+
+
+def _sum_by_period(keys: np.ndarray, minutes: np.ndarray) -> pd.Series:
+    """Total ``minutes`` per datetime64 key, newest period first.
+
+    Keys are factorised to integer codes and summed with ``np.bincount``,
+    a single C loop that avoids building a pandas GroupBy per period type.
+    """
+    codes, periods = pd.factorize(keys)
+    totals = np.bincount(codes, weights=minutes, minlength=len(periods))
+    return pd.Series(totals, index=periods).sort_index(ascending=False)
+
+
+def _escape_rows(rows: List[Tuple[str, str]]) -> List[Tuple[Markup, Markup]]:
+    """HTML-escape summary rows once so template autoescaping passes them through."""
+    return [(escape(label), escape(duration)) for label, duration in rows]
 
 
 def build_summary(log_df: pd.DataFrame) -> Dict[str, List[Tuple[str, str]]]:
+    """Total the logged minutes per period, activity, and project.
+
+    Expects the output of ``normalize_log_dataframe`` so Project and Activity
+    are grouped by their categorical codes. Works on column views of
+    ``log_df`` without copying or modifying the frame.
+    """
     if log_df.empty:
         return {
             "daily": [],
@@ -177,111 +622,203 @@ def build_summary(log_df: pd.DataFrame) -> Dict[str, List[Tuple[str, str]]]:
             "activities": [],
             "projects": [],
         }
-    df = log_df.copy()
-    df["Start"] = pd.to_datetime(df["Start"], errors="coerce")
-    df = df.dropna(subset=["Start"])
-    df["DurationMinutes"] = pd.to_numeric(df["DurationMinutes"], errors="coerce").fillna(0)
-
-    df["DateOnly"] = df["Start"].dt.date
-    daily_series = df.groupby("DateOnly")["DurationMinutes"].sum().sort_index(ascending=False)
-    daily = [(date.strftime("%b %d, %Y"), format_duration(minutes)) for date, minutes in daily_series.items()]
-
-    df["WeekStart"] = df["Start"].dt.to_period("W").apply(lambda p: p.start_time.date())
-    weekly_series = df.groupby("WeekStart")["DurationMinutes"].sum().sort_index(ascending=False)
-    weekly = [
-        (format_week_label(pd.Timestamp(week).to_pydatetime()), format_duration(minutes))
-        for week, minutes in weekly_series.items()
-    ]
+    starts = _as_datetime(log_df["Start"])
+    mask = starts.notna()
+    starts = starts[mask]
+    durations = pd.to_numeric(log_df["DurationMinutes"], errors="coerce").fillna(0)[mask]
+
+    days = starts.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    # 1970-01-01 was a Thursday, so shifting day numbers by 3 puts Monday at 0.
+    weeks = days - ((days.view("i8") + 3) % 7).astype("timedelta64[D]")
+    months = days.astype("datetime64[M]")
+    years = days.astype("datetime64[Y]")
+    duration_values = durations.to_numpy()
+
+    daily_series = _sum_by_period(days, duration_values)
+    daily = list(
+        zip(
+            [_format_date(day) for day in daily_series.index],
+            format_durations(daily_series.to_numpy()),
+        )
+    )
 
-    df["MonthPeriod"] = df["Start"].dt.to_period("M")
-    monthly_series = df.groupby("MonthPeriod")["DurationMinutes"].sum().sort_index(ascending=False)
-    monthly = [
-        (period.strftime("%b %Y"), format_duration(minutes))
-        for period, minutes in monthly_series.items()
-    ]
+    weekly_series = _sum_by_period(weeks, duration_values)
+    weekly = list(
+        zip(
+            [format_week_label(week.to_pydatetime()) for week in weekly_series.index],
+            format_durations(weekly_series.to_numpy()),
+        )
+    )
 
-    df["YearValue"] = df["Start"].dt.year
-    yearly_series = df.groupby("YearValue")["DurationMinutes"].sum().sort_index(ascending=False)
-    yearly = [(str(year), format_duration(minutes)) for year, minutes in yearly_series.items()]
+    monthly_series = _sum_by_period(months, duration_values)
+    monthly = list(
+        zip(
+            [
+                f"{_MONTH_ABBREVIATIONS[month.month]} {month.year}"
+                for month in monthly_series.index
+            ],
+            format_durations(monthly_series.to_numpy()),
+        )
+    )
+
+    yearly_series = _sum_by_period(years, duration_values)
+    yearly = list(
+        zip(
+            [str(year.year) for year in yearly_series.index],
+            format_durations(yearly_series.to_numpy()),
+        )
+    )
 
-    activity_df = df.copy()
-    activity_df["Project"] = activity_df["Project"].astype(str).str.strip()
-    activity_df["Activity"] = activity_df["Activity"].astype(str).str.strip()
+    project_names = log_df["Project"][mask]
+    activity_names = log_df["Activity"][mask]
+    has_project = project_names != ""
+    has_activity = has_project & (activity_names != "")
     activity_series = (
-        activity_df[(activity_df["Project"] != "") & (activity_df["Activity"] != "")]
-        .groupby(["Project", "Activity"])["DurationMinutes"]
+        durations[has_activity]
+        .groupby(
+            [project_names[has_activity], activity_names[has_activity]], observed=True
+        )
         .sum()
         .sort_values(ascending=False)
     )
-    activities = [
-        (f"{project} · {activity}", format_duration(minutes))
-        for (project, activity), minutes in activity_series.items()
-    ]
+    activities = list(
+        zip(
+            [f"{project} · {activity}" for project, activity in activity_series.index],
+            format_durations(activity_series.to_numpy()),
+        )
+    )
 
     project_series = (
-        activity_df[activity_df["Project"] != ""]
-        .groupby("Project")["DurationMinutes"]
+        durations[has_project]
+        .groupby(project_names[has_project], observed=True)
         .sum()
         .sort_values(ascending=False)
     )
-    projects = [(project, format_duration(minutes)) for project, minutes in project_series.items()]
+    projects = list(
+        zip(
+            [str(project) for project in project_series.index],
+            format_durations(project_series.to_numpy()),
+        )
+    )
 
     return {
-        "daily": daily,
-        "weekly": weekly,
-        "monthly": monthly,
-        "yearly": yearly,
-        "activities": activities,
-        "projects": projects,
+        "daily": _escape_rows(daily),
+        "weekly": _escape_rows(weekly),
+        "monthly": _escape_rows(monthly),
+        "yearly": _escape_rows(yearly),
+        "activities": _escape_rows(activities),
+        "projects": _escape_rows(projects),
     }
 
 
 def get_recent_logs(log_df: pd.DataFrame, limit: int = 10) -> List[Dict[str, str]]:
+    """Format the ``limit`` most recent sessions as pre-escaped markup.
+
+    Only those rows are touched.
+    """
     if log_df.empty:
         return []
-    df = log_df.copy()
-    df["Start"] = pd.to_datetime(df["Start"], errors="coerce")
-    df["End"] = pd.to_datetime(df["End"], errors="coerce")
-    df = df.dropna(subset=["Start", "End"])
-    recent = df.sort_values("Start", ascending=False).head(limit)
-    entries: List[Dict[str, str]] = []
-    for _, row in recent.iterrows():
-        date_value = row.get("Date", "")
-        if isinstance(date_value, pd.Timestamp):
-            date_value = date_value.date()
-        if isinstance(date_value, datetime):
-            date_display = date_value.strftime("%b %d, %Y")
-        elif isinstance(date_value, date):
-            date_display = date_value.strftime("%b %d, %Y")
-        else:
-            date_display = str(date_value) if date_value else ""
-        entries.append(
-            {
-                "date": date_display,
-                "project": row.get("Project", ""),
-                "activity": row.get("Activity", ""),
-                "start": row["Start"].strftime("%b %d, %Y %I:%M %p"),
-                "end": row["End"].strftime("%b %d, %Y %I:%M %p"),
-                "duration": format_duration(row.get("DurationMinutes", 0)),
-                "notes": row.get("Notes", ""),
-            }
+    starts = _as_datetime(log_df["Start"])
+    ends = _as_datetime(log_df["End"])
+    valid = starts.notna() & ends.notna()
+    latest = starts[valid].sort_values(ascending=False).head(limit).index
+    recent = log_df.loc[latest]
+    dates = [
+        "" if pd.isna(day) else _format_date(day)
+        for day in recent["Date"]
+    ]
+    start_labels = [_format_datetime(start) for start in starts[latest]]
+    end_labels = [_format_datetime(end) for end in ends[latest]]
+    durations = format_durations(recent["DurationMinutes"].to_numpy())
+    return [
+        {
+            "date": escape(date_label),
+            "project": escape(project),
+            "activity": escape(activity),
+            "start": escape(start_label),
+            "end": escape(end_label),
+            "duration": escape(duration),
+            "notes": escape(notes),
+        }
+        for date_label, project, activity, start_label, end_label, duration, notes in zip(
+            dates,
+            recent["Project"].tolist(),
+            recent["Activity"].tolist(),
+            start_labels,
+            end_labels,
+            durations,
+            recent["Notes"].tolist(),
         )
-    return entries
+    ]
+
+
+def _memoise(version: Tuple[int, ...], key: str, build: Callable[[], Any]) -> Any:
+    """Return ``build()``, cached alongside the frames read at ``version``.
+
+    ``build`` must only use frames returned together with ``version``; results
+    are dropped whenever the frame cache is refreshed or invalidated.
+    """
+    with _WB_CACHE_LOCK:
+        if _WB_CACHE["version"] == version and key in _WB_CACHE["derived"]:
+            return _WB_CACHE["derived"][key]
+    value = build()
+    with _WB_CACHE_LOCK:
+        if _WB_CACHE["version"] == version:
+            _WB_CACHE["derived"][key] = value
+    return value
+
+
+def get_project_catalog(
+    version: Tuple[int, ...], projects_df: pd.DataFrame
+) -> ProjectCatalog:
+    """Memoised ``build_project_catalog`` for the frames read at ``version``.
+
+    The returned mapping and set are shared between requests and must not be
+    modified.
+    """
+    return _memoise(version, "catalog", lambda: build_project_catalog(projects_df))
+
+
+def get_normalized_log(version: Tuple[int, ...], log_df: pd.DataFrame) -> pd.DataFrame:
+    """Memoised ``normalize_log_dataframe`` for the frames read at ``version``."""
+    return _memoise(version, "normalized_log", lambda: normalize_log_dataframe(log_df))
+
+
+def get_summary(
+    version: Tuple[int, ...], normalized_log: pd.DataFrame
+) -> Dict[str, List[Tuple[str, str]]]:
+    """Memoised ``build_summary`` for the frames read at ``version``."""
+    return _memoise(version, "summary", lambda: build_summary(normalized_log))
+
+
+def read_project_catalog() -> ProjectCatalog:
+    """Return the project catalog without loading the log.
+
+    Reuses the index page's catalog while the frame cache is current and
+    otherwise builds it from a fresh read of the projects table alone.
+    """
+    flush_writes()
+    with _WB_CACHE_LOCK:
+        if _WB_CACHE["version"] == _database_version():
+            catalog = _WB_CACHE["derived"].get("catalog")
+            if catalog is not None:
+                return catalog
+    return build_project_catalog(read_projects())
 
 
 def build_active_entry(active_df: pd.DataFrame) -> Dict[str, str]:
     if active_df.empty:
         return {}
-    row = active_df.iloc[0].to_dict()
-    start_value = row.get("Start")
-    start_dt = pd.to_datetime(start_value, errors="coerce")
+    row = active_df.iloc[0]
+    start_dt = pd.to_datetime(row["Start"], errors="coerce")
     if pd.isna(start_dt):
         return {}
+    row = row.fillna("")
     return {
-        "project": _safe_string(row.get("Project", "")),
-        "activity": _safe_string(row.get("Activity", "")),
-        "notes": _safe_string(row.get("Notes", "")),
-        "start_display": start_dt.strftime("%b %d, %Y %I:%M %p"),
+        "project": str(row["Project"]),
+        "activity": str(row["Activity"]),
+        "notes": str(row["Notes"]),
+        "start_display": _format_datetime(start_dt),
         "start_iso": start_dt.isoformat(),
     }
 
@@ -298,10 +835,12 @@ def index():
         flash("Unsupported action.", "error")
         return redirect(url_for("index"))
 
-    log_df, projects_df, active_df = read_workbook()
-    normalized_log = normalize_log_dataframe(log_df)
-    project_map = build_project_map(projects_df)
-    summary = build_summary(normalized_log)
+    for message in pop_write_failures():
+        flash(message, "error")
+    version, (log_df, projects_df, active_df) = _read_workbook_versioned()
+    project_map, _ = get_project_catalog(version, projects_df)
+    normalized_log = get_normalized_log(version, log_df)
+    summary = get_summary(version, normalized_log)
     recent_logs = get_recent_logs(normalized_log)
     active_entry = build_active_entry(active_df)
 
@@ -317,7 +856,7 @@ def index():
 
 
 def handle_start():
-    log_df, projects_df, active_df = read_workbook()
+    active_df = read_active()
     if not active_df.empty:
         flash("A timer is already running. Stop it before starting a new one.", "error")
         return redirect(url_for("index"))
@@ -330,28 +869,28 @@ def handle_start():
     if not activity:
         flash("Please choose an activity before starting the timer.", "error")
         return redirect(url_for("index"))
-    project_map = build_project_map(projects_df)
+    project_map, _ = read_project_catalog()
     if project not in project_map or activity not in project_map[project]:
         flash("The selected project and activity are not defined.", "error")
         return redirect(url_for("index"))
     start_time = datetime.now()
-    active_entry_df = pd.DataFrame(
-        [
-            {
+    submit_write(
+        partial(
+            write_active,
+            entry={
                 "Project": project,
                 "Activity": activity,
                 "Notes": notes,
                 "Start": start_time,
-            }
-        ]
+            },
+        )
     )
-    write_workbook(log_df, projects_df, active_entry_df)
     flash(f"Timer started for {activity} in {project}.", "success")
     return redirect(url_for("index"))
 
 
 def handle_stop():
-    log_df, projects_df, active_df = read_workbook()
+    active_df = read_active()
     if active_df.empty:
         flash("No running timer to stop.", "error")
         return redirect(url_for("index"))
@@ -360,7 +899,7 @@ def handle_stop():
     start_dt = pd.to_datetime(active_entry.get("Start"), errors="coerce")
     if pd.isna(start_dt):
         flash("The active timer has an invalid start time and was cleared.", "error")
-        write_workbook(log_df, projects_df, pd.DataFrame(columns=ACTIVE_COLUMNS))
+        submit_write(partial(write_active, entry=None))
         return redirect(url_for("index"))
     end_dt = datetime.now()
     duration_minutes = round((end_dt - start_dt).total_seconds() / 60, 2)
@@ -373,8 +912,12 @@ def handle_stop():
         "DurationMinutes": duration_minutes,
         "Notes": notes or active_entry.get("Notes", ""),
     }
-    updated_log = pd.concat([log_df, pd.DataFrame([entry])], ignore_index=True)
-    write_workbook(updated_log, projects_df, pd.DataFrame(columns=ACTIVE_COLUMNS))
+
+    def save_session(conn: sqlite3.Connection) -> None:
+        if stop_active(conn, start_dt):
+            append_log_row(conn, entry)
+
+    submit_write(save_session)
     flash("Session saved to the time log.", "success")
     return redirect(url_for("index"))
 
@@ -388,5 +931,15 @@ def add_project():
     return redirect(url_for("index"))
 
 
+@app.route("/export", methods=["GET"])
+def export_excel():
+    return send_file(
+        export_workbook(),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name="time_tracker.xlsx",
+    )
+
+
 if __name__ == "__main__":
     app.run(debug=True)